@@ -5,184 +5,693 @@ photometric B--V colour index for each star in ``blue_stars.csv`` and
 computes the corresponding effective temperature and an approximate RGB
 colour.  The results are written to ``blue_stars_results.csv``.
 
+All star names are first resolved to positions with one Simbad request and
+cross-matched against each catalogue in a single positional query; the
+slower per-name lookups are only used for stars without a match.
+
 ``astroquery`` is required to actually run the catalogue queries.  When
 network access is not available the script will still run but will mark
 the stars as ``not found``.  If an exception occurs while computing the
 temperature or colour, the star is marked as ``processing error`` and the
 exception message is saved in the ``error_message`` column of the output.
+``numba`` is optional; when installed, the B--V to temperature conversion
+is compiled into a ufunc.
 """
 
 import argparse
+import csv
+import functools
+import os
+import shelve
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
 import pandas as pd
 import numpy as np
+import astropy.units as u
+from astropy.coordinates import SkyCoord
 from astroquery.vizier import Vizier
 from astroquery.simbad import Simbad
 
+try:
+    from numba import vectorize
+except ImportError:  # numba is optional and only speeds up bv_to_temperature
+    vectorize = None
+
+NAME_COLUMNS = ["name_input", "name_resolved", "name_alt1"]
+MATCH_RADIUS = 5 * u.arcsec
+PHOTOMETRY_COLUMNS = ["bv", "ub", "vmag", "source", "resolved_used"]
+OUTPUT_COLUMNS = [
+    "name", "resolved_used", "V", "B-V", "U-B", "T_eff_K", "RGB", "hex_color",
+    "source", "status", "error_message",
+]
+MAX_CONCURRENT_LOOKUPS = 32
+CACHE_FILE = "vizier_cache.db"
+CACHE_EXPIRY = 30 * 86400  # seconds
+
+# Catalogues in order of preference: (source, VizieR id, columns,
+# server-side filters, whether B-V comes from Tycho BT/VT).  A "!=" filter
+# makes VizieR return only rows where that column is not empty.
+CATALOGS = [
+    ("GCPD", "II/215", ["Star", "Vmag", "B-V", "U-B"], {"B-V": "!="}, False),
+    ("APASS", "II/336/apass9", ["B-V", "Vmag", "Bmag"], {"B-V": "!="}, False),
+    ("Tycho-2", "I/259/tyc2", ["BTmag", "VTmag"], {"BTmag": "!=", "VTmag": "!="}, True),
+]
+
+@functools.lru_cache(maxsize=None)
+def _simbad_client():
+    """Return the shared Simbad instance configured for UBV fluxes.
+
+    It is created on first use rather than at import time because newer
+    astroquery versions contact the service while adding the fields.
+    """
+    simbad = Simbad()
+    try:
+        simbad.add_votable_fields("U", "B", "V")
+    except KeyError:
+        # astroquery < 0.4.8 only knows the flux(...) notation and rejects
+        # other field names with a KeyError.  Connection failures propagate.
+        simbad.add_votable_fields("flux(U)", "flux(B)", "flux(V)")
+    simbad.TIMEOUT = 30
+    return simbad
+
+def make_catalogs(row_limit):
+    """Return ``(source, vizier, catalog_id, extract_tycho)`` for ``CATALOGS``.
+
+    Each ``Vizier`` instance fetches at most ``row_limit`` rows (``-1`` for
+    no limit) and only rows passing the catalogue's column filters.
+    """
+    return [
+        (source, Vizier(columns=columns, column_filters=filters, row_limit=row_limit),
+         catalog_id, extract_tycho)
+        for source, catalog_id, columns, filters, extract_tycho in CATALOGS
+    ]
+
+def _float_ufunc(func):
+    """Compile a scalar float function into a NumPy ufunc when numba is available.
+
+    Without numba the plain function is returned, which already broadcasts
+    over arrays.  The ``nnan``/``ninf`` fast-math flags are left out so that
+    missing B-V values and the pole of the B-V fit still yield NaN/inf.
+    """
+    if vectorize is None:
+        return func
+    return vectorize(
+        ["float64(float64)"], fastmath={"contract", "arcp", "reassoc"}, cache=True
+    )(func)
+
+@_float_ufunc
 def bv_to_temperature(bv):
-    return 4600 * ((1 / (0.92 * bv + 1.7)) + (1 / (0.92 * bv + 0.62)))
+    """Convert B-V colour indices to effective temperatures in Kelvin.
+
+    Works element-wise on NumPy arrays as well as on scalars.
+    """
+    return 4600.0 * ((1.0 / (0.92 * bv + 1.7)) + (1.0 / (0.92 * bv + 0.62)))
+
+def _rgb_from_temperature(temps):
+    """Evaluate the temperature-to-colour fit for an array of temperatures.
+
+    Returns an ``(N, 3)`` array of RGB components scaled to ``[0, 1]``.
+    """
+    t = np.asarray(temps, dtype=np.float64) / 100.0
+    # Both branches are evaluated for every element; the ones that are
+    # thrown away may hit log(<=0) or negative fractional powers.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(t < 66, 255.0, 329.69 * (t - 60) ** -0.1332)
+        g_lo = 99.47 * np.log(np.maximum(t, 1e-9)) - 161.12
+        g_hi = 288.12 * (t - 60) ** -0.0755
+        g = np.where(t < 66, g_lo, g_hi)
+        b_lo = np.where(t < 19, 0.0, 138.51 * np.log(np.maximum(t - 10, 1e-9)) - 305.04)
+        b = np.where(t < 66, b_lo, 255.0)
+    return np.clip(np.stack([r, g, b], axis=1), 0, 255) / 255.0
+
+# Lookup tables for temperature_to_rgb.  The fit jumps at 6600 K, so the
+# cool and hot branches get separate grids and are never interpolated
+# across the jump.  Geometric spacing keeps the interpolation error well
+# below one 8-bit colour step.
+_T_COOL = np.geomspace(1000.0, np.nextafter(6600.0, 0.0), 2048)
+_T_HOT = np.geomspace(6600.0, 60000.0, 2048)
+_RGB_COOL = _rgb_from_temperature(_T_COOL)
+_RGB_HOT = _rgb_from_temperature(_T_HOT)
 
 def temperature_to_rgb(temp_k):
-    """Map a temperature in Kelvin to an RGB triple and its hexadecimal code."""
-    t = temp_k / 100.0
-    if t < 66:
-        r = 255
-        g = 99.47 * np.log(t) - 161.12
-        b = 0 if t < 19 else 138.51 * np.log(t - 10) - 305.04
+    """Map temperatures in Kelvin to RGB triples and hexadecimal codes.
+
+    ``temp_k`` may be a scalar, in which case an ``(r, g, b)`` tuple and a
+    single hex string are returned, or an array of ``N`` temperatures, in
+    which case an ``(N, 3)`` array and a list of ``N`` hex strings are
+    returned.  RGB components are scaled to ``[0, 1]``.
+
+    Temperatures between 1000 K and 60000 K are interpolated from
+    precomputed tables; anything outside is evaluated directly.
+    """
+    temps = np.asarray(temp_k, dtype=np.float64)
+    t = np.atleast_1d(temps)
+    cool = (t >= _T_COOL[0]) & (t < _T_HOT[0])
+    hot = (t >= _T_HOT[0]) & (t <= _T_HOT[-1])
+    other = ~(cool | hot)
+    rgb = np.empty((t.size, 3))
+    for channel in range(3):
+        rgb[cool, channel] = np.interp(t[cool], _T_COOL, _RGB_COOL[:, channel])
+        rgb[hot, channel] = np.interp(t[hot], _T_HOT, _RGB_HOT[:, channel])
+    if other.any():
+        rgb[other] = _rgb_from_temperature(t[other])
+    channels = (rgb * 255).astype(np.uint32)
+    packed = (channels[:, 0] << 16) | (channels[:, 1] << 8) | channels[:, 2]
+    hex_colors = [f"#{value:06X}" for value in packed.tolist()]
+    if temps.ndim == 0:
+        return tuple(rgb[0]), hex_colors[0]
+    return rgb, hex_colors
+
+def _float_column(table, name):
+    """Return a table column as a float array with masked entries set to NaN."""
+    return np.ma.filled(np.ma.asarray(table[name], dtype=np.float64), np.nan)
+
+def _table_photometry(table, extract_tycho=False):
+    """Return the ``(bv, ub, vmag)`` columns of a catalogue table as arrays.
+
+    ``ub`` and ``vmag`` are ``None`` when the catalogue lacks them.  Returns
+    ``None`` if the table has no usable B-V column.
+    """
+    colnames = set(table.colnames)
+    if extract_tycho:
+        if 'BTmag' not in colnames or 'VTmag' not in colnames:
+            return None
+        vmag = _float_column(table, 'VTmag')
+        return _float_column(table, 'BTmag') - vmag, None, vmag
+    if 'B-V' not in colnames:
+        return None
+    bv = _float_column(table, 'B-V')
+    ub = _float_column(table, 'U-B') if 'U-B' in colnames else None
+    vmag = _float_column(table, 'Vmag') if 'Vmag' in colnames else None
+    return bv, ub, vmag
+
+def _photometry_at(columns, i):
+    """Pick row ``i`` of the arrays returned by :func:`_table_photometry`."""
+    bv, ub, vmag = columns
+    return (
+        float(bv[i]),
+        None if ub is None else float(ub[i]),
+        np.nan if vmag is None else float(vmag[i]),
+    )
+
+def _query_catalog(vizier, name, catalog_id, extract_tycho=False):
+    """Query ``catalog_id`` for ``name`` and return its first usable photometry.
+
+    Returns ``(bv, ub, vmag)`` from the first row with a finite B-V, or
+    ``None`` if the catalogue has no such row.  Failed requests raise, so
+    that :func:`lookup_stars` does not store them as misses.
+    """
+    result = vizier.query_object(name, catalog=catalog_id)
+    if not result or len(result) == 0:
+        return None
+    columns = _table_photometry(result[0], extract_tycho)
+    if columns is None:
+        return None
+    usable = np.isfinite(columns[0])
+    if not usable.any():
+        return None
+    return _photometry_at(columns, int(np.argmax(usable)))
+
+def _simbad_row_names(table, names):
+    """Return which of the queried ``names`` each Simbad result row belongs to.
+
+    astroquery 0.4.8 and later echo the input in ``user_specified_id``;
+    older versions number the inputs from 1 in ``SCRIPT_NUMBER_ID``.
+    """
+    if 'user_specified_id' in table.colnames:
+        return [str(name) for name in table['user_specified_id']]
+    if 'SCRIPT_NUMBER_ID' in table.colnames:
+        return [names[int(number) - 1] for number in table['SCRIPT_NUMBER_ID']]
+    if len(table) == len(names):
+        return list(names)
+    raise ValueError("cannot match Simbad rows to the queried names")
+
+def _simbad_coordinates(table):
+    """Return the positions of a Simbad result and a mask of usable rows.
+
+    Handles both the ``ra``/``dec`` columns in degrees of astroquery 0.4.8
+    and later and the older sexagesimal ``RA``/``DEC`` columns.
+    """
+    if 'ra' in table.colnames and 'dec' in table.colnames:
+        ra, dec, unit = table['ra'], table['dec'], (u.deg, u.deg)
+    elif 'RA' in table.colnames and 'DEC' in table.colnames:
+        ra, dec, unit = table['RA'], table['DEC'], (u.hourangle, u.deg)
     else:
-        r = 329.69 * ((t - 60) ** -0.1332)
-        g = 288.12 * ((t - 60) ** -0.0755)
-        b = 255
-    rgb = tuple(np.clip([r, g, b], 0, 255) / 255.0)
-    hex_color = "#{:02X}{:02X}{:02X}".format(
-        int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255)
+        raise ValueError("Simbad result has no RA/Dec columns")
+    usable = ~(np.ma.getmaskarray(ra) | np.ma.getmaskarray(dec))
+    if ra.dtype.kind in "US":
+        usable &= (np.char.strip(np.asarray(ra, dtype=str)) != "")
+    coords = SkyCoord(
+        np.asarray(ra)[usable].tolist(), np.asarray(dec)[usable].tolist(), unit=unit
     )
-    return rgb, hex_color
+    return coords, usable
 
-def try_catalog(vizier, name, catalog_id, extract_tycho=False):
+def resolve_coordinates(names):
+    """Resolve star names to ICRS positions with a single Simbad request.
+
+    Returns a dict mapping every name Simbad could resolve to its
+    ``SkyCoord``.  Unresolved names are simply left out.
+    """
+    names = list(names)
     try:
-        result = vizier.query_object(name, catalog=catalog_id)
-        if not result or len(result) == 0:
-            return None
-        for row in result[0]:
-            try:
-                if extract_tycho:
-                    bt = float(row['BTmag']) if 'BTmag' in row.colnames else None
-                    vt = float(row['VTmag']) if 'VTmag' in row.colnames else None
-                    vmag = vt
-                    bv = bt - vt if bt is not None and vt is not None else None
-                    return bv, None, vmag if bv is not None else None
-                else:
-                    bv = float(row['B-V']) if 'B-V' in row.colnames else None
-                    ub = float(row['U-B']) if 'U-B' in row.colnames else None
-                    vmag = float(row.get('Vmag', np.nan))
-                    if bv is not None:
-                        return bv, ub, vmag
-            except Exception:
-                continue
+        res = Simbad.query_objects(names)
+    except Exception as exc:
+        print(f"⚠️ Simbad name resolution failed: {exc}")
+        return {}
+    if res is None or len(res) == 0:
+        return {}
+    try:
+        row_names = _simbad_row_names(res, names)
+        coords, usable = _simbad_coordinates(res)
+    except ValueError as exc:
+        print(f"⚠️ Could not read Simbad positions: {exc}")
+        return {}
+    resolved = {}
+    for name, coord in zip(np.asarray(row_names, dtype=object)[usable], coords):
+        resolved.setdefault(name, coord)
+    return resolved
+
+def query_catalog_batch(vizier, catalog_id, coords, extract_tycho=False):
+    """Cross-match all positions against a catalogue in one request.
+
+    ``coords`` is a ``SkyCoord`` array.  Returns a dict mapping the index
+    of each position to the ``(bv, ub, vmag)`` tuple of its first usable
+    match.
+    """
+    try:
+        result = vizier.query_region(coords, radius=MATCH_RADIUS, catalog=catalog_id)
     except Exception:
-        return None
-    return None
+        return {}
+    if not result or len(result) == 0:
+        return {}
+    table = result[0]
+    columns = _table_photometry(table, extract_tycho)
+    if columns is None:
+        return {}
+    # VizieR numbers the uploaded targets from 1 in the ``_q`` column.
+    if '_q' in table.colnames:
+        target = np.asarray(table['_q'], dtype=int) - 1
+    else:
+        target = np.zeros(len(table), dtype=int)
+    usable = np.flatnonzero(np.isfinite(columns[0]))
+    positions, first = np.unique(target[usable], return_index=True)
+    return {
+        int(pos): _photometry_at(columns, i)
+        for pos, i in zip(positions, usable[first])
+    }
 
-def try_simbad(name):
-    """Try to get B, V and U fluxes from Simbad."""
+def photometry_frame(rows):
+    """Build a photometry table from ``{star: (bv, ub, vmag, source, name)}``.
+
+    The table is indexed by star number with ``PHOTOMETRY_COLUMNS``.
+    """
+    return pd.DataFrame(
+        list(rows.values()), index=list(rows.keys()), columns=PHOTOMETRY_COLUMNS
+    )
+
+def merge_by_priority(frames):
+    """Merge photometry tables, keeping each star from the first table listing it.
+
+    Whole rows are taken from a single table so that B-V, U-B and V of a
+    star always come from the same source.
+    """
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return photometry_frame({})
+    merged = frames[0]
+    for frame in frames[1:]:
+        merged = pd.concat([merged, frame[~frame.index.isin(merged.index)]])
+    return merged
+
+def batch_crossmatch(candidates, catalogs):
+    """Look up every star by position with one query per catalogue.
+
+    ``candidates`` holds the name candidates of every star and
+    ``catalogs`` is an ordered list of
+    ``(source, vizier, catalog_id, extract_tycho)``.  All distinct names are
+    resolved in one Simbad request and each star is placed at the position
+    of its first resolvable name.  Returns one photometry table per
+    catalogue, in the same order.
+    """
+    resolved = resolve_coordinates({name for names in candidates for name in names})
+    targets = []
+    for i, names in enumerate(candidates):
+        name = next((name for name in names if name in resolved), None)
+        if name is not None:
+            targets.append((i, name))
+    if not targets:
+        return []
+    coords = SkyCoord([resolved[name] for _, name in targets])
+    frames = []
+    for source, vizier, catalog_id, extract_tycho in catalogs:
+        matches = query_catalog_batch(vizier, catalog_id, coords, extract_tycho)
+        frames.append(photometry_frame({
+            targets[pos][0]: (bv, ub, vmag, source, targets[pos][1])
+            for pos, (bv, ub, vmag) in matches.items()
+        }))
+    return frames
+
+def _simbad_fluxes(table):
+    """Return the U, B and V magnitudes of a Simbad result as float arrays.
+
+    astroquery 0.4.8 and later name the columns ``U``/``B``/``V``, older
+    versions ``FLUX_U``/``FLUX_B``/``FLUX_V``.  Masked values become NaN.
+    """
+    fluxes = []
+    for band in ("U", "B", "V"):
+        for column in (band, f"FLUX_{band}"):
+            if column in table.colnames:
+                fluxes.append(_float_column(table, column))
+                break
+        else:
+            raise ValueError(f"Simbad result has no {band} magnitude column")
+    return fluxes
+
+def try_simbad_batch(names):
+    """Get B, V and U fluxes for several names with one Simbad request.
+
+    Returns a dict mapping each name with usable fluxes to
+    ``(bv, ub, vmag)``, or ``None`` if the request failed or its result
+    could not be read.
+    """
+    names = list(names)
     try:
-        sim = Simbad()
-        sim.add_votable_fields("flux(U)", "flux(B)", "flux(V)")
-        res = sim.query_object(name)
-        if res is None:
-            return None
-        bmag = res["FLUX_B"][0]
-        vmag = res["FLUX_V"][0]
-        umag = res["FLUX_U"][0]
-        if bmag is None or vmag is None:
-            return None
-        bv = float(bmag) - float(vmag)
-        ub = None if umag is None else float(bmag) - float(umag)
-        return bv, ub, float(vmag)
+        res = _simbad_client().query_objects(names)
     except Exception:
         return None
+    found = {}
+    if res is None or len(res) == 0:
+        return found
+    try:
+        row_names = _simbad_row_names(res, names)
+        umag, bmag, vmag = _simbad_fluxes(res)
+    except ValueError as exc:
+        print(f"⚠️ Could not read Simbad photometry: {exc}")
+        return None
+    for name, u_mag, b_mag, v_mag in zip(row_names, umag, bmag, vmag):
+        if name in found or np.isnan(b_mag) or np.isnan(v_mag):
+            continue
+        ub = None if np.isnan(u_mag) else float(u_mag - b_mag)
+        found[name] = (float(b_mag - v_mag), ub, float(v_mag))
+    return found
 
-def process_star_catalog(csv_input="blue_stars.csv", csv_output="blue_stars_results.csv"):
-    """Process the input catalogue and write the results."""
-    df = pd.read_csv(csv_input)
-    total = len(df)
-    Vizier.ROW_LIMIT = 200
-    gcpd = Vizier(columns=["Star", "Vmag", "B-V", "U-B"])
-    apass = Vizier(columns=["B-V", "Vmag", "Bmag"])
-    tycho = Vizier(columns=["BTmag", "VTmag"])
-
-    results = []
-
-    for idx, (_, row) in enumerate(df.iterrows(), start=1):
-        name_candidates = [
-            row[col] for col in ["name_input", "name_resolved", "name_alt1"]
-            if pd.notna(row[col])
-        ]
-        print(f"[{idx}/{total}] {name_candidates[0]}")
-        bv = ub = vmag = None
-        source = "none"
-        status = "not found"
-        resolved_used = None
-
-        for name in name_candidates:
-            gcpd_result = try_catalog(gcpd, name, "II/215")
-            if gcpd_result:
-                bv, ub, vmag = gcpd_result
-                source = "GCPD"
-                resolved_used = name
+def simbad_lookup(names, cache=None):
+    """Look up Simbad photometry for ``names`` in a single request.
+
+    Names with a fresh entry in ``cache`` are not queried again.  Returns a
+    dict mapping names to ``(bv, ub, vmag)``.
+    """
+    names = list(dict.fromkeys(names))
+    if cache is None:
+        return try_simbad_batch(names) or {}
+    now = time.time()
+    found = {}
+    todo = []
+    for name in names:
+        entry = cache.get(f"Simbad|{name}")
+        if entry is not None and now - entry[0] < CACHE_EXPIRY:
+            if entry[1] is not None:
+                found[name] = entry[1]
+        else:
+            todo.append(name)
+    if todo:
+        fetched = try_simbad_batch(todo)
+        if fetched is not None:
+            for name in todo:
+                cache[f"Simbad|{name}"] = (now, fetched.get(name))
+            found.update(fetched)
+    return found
+
+def _lookup_key(name, catalog):
+    """Return the cache key of a by-name query of one catalogue.
+
+    ``catalog`` is a ``(source, vizier, catalog_id, extract_tycho)`` tuple.
+    The query settings are part of the key, so that entries stored by a
+    differently configured query are never served.
+    """
+    _, vizier, catalog_id, extract_tycho = catalog
+    config = f"{sorted(vizier.columns)}|{sorted(vizier.column_filters.items())}|{vizier.ROW_LIMIT}"
+    return f"{catalog_id}|{name}|{extract_tycho}|{config}"
+
+def first_hits(pending, hits, source):
+    """Pick, for every pending star, the first of its names found in ``hits``.
+
+    ``pending`` maps star indices to their name candidates and ``hits``
+    maps names to ``(bv, ub, vmag)``.  Returns a photometry table.
+    """
+    rows = {}
+    for i, names in pending.items():
+        for name in names:
+            if name in hits:
+                rows[i] = (*hits[name], source, name)
                 break
+    return photometry_frame(rows)
+
+def lookup_stars(pending, catalogs, cache=None):
+    """Look up several stars by name in all catalogues at once.
+
+    ``pending`` maps star indices to their name candidates.  Every
+    distinct name is queried once per catalogue, even when it is shared by
+    several stars or repeated among a star's candidates.  All catalogues
+    are queried at the same time rather than one after the other; the
+    astroquery calls block, so up to ``MAX_CONCURRENT_LOOKUPS`` requests run
+    at once in worker threads.  Returns one photometry table per
+    catalogue, in the same order as ``catalogs``.
 
-        if bv is None:
-            for name in name_candidates:
-                apass_result = try_catalog(apass, name, "II/336/apass9")
-                if apass_result:
-                    bv, ub, vmag = apass_result
-                    source = "APASS"
-                    resolved_used = name
-                    break
-
-        if bv is None:
-            for name in name_candidates:
-                tycho_result = try_catalog(tycho, name, "I/259/tyc2", extract_tycho=True)
-                if tycho_result:
-                    bv, ub, vmag = tycho_result
-                    source = "Tycho-2"
-                    resolved_used = name
-                    break
-
-        if bv is None:
-            for name in name_candidates:
-                simbad_result = try_simbad(name)
-                if simbad_result:
-                    bv, ub, vmag = simbad_result
-                    source = "Simbad"
-                    resolved_used = name
-                    break
-
-error_message = None
-        if bv is None:
-            status = "no B-V"
-            temp = rgb = hex_color = None
-            print(f"⚠️ No usable B–V found for {name_candidates[0]}")
+    ``cache`` is an open ``shelve`` or ``None`` to disable caching.  Misses
+    are stored as well so that they are not repeated on every run, but all
+    entries expire after ``CACHE_EXPIRY`` seconds.  Failed requests are
+    not stored, so that they are retried on the next run.
+    """
+    names = list(dict.fromkeys(name for names in pending.values() for name in names))
+    pairs = [(name, catalog) for catalog in catalogs for name in names]
+    # The cache is only touched from this thread: some dbm backends, such
+    # as dbm.sqlite3, refuse to be used from any other thread.
+    now = time.time()
+    results = [None] * len(pairs)
+    misses = []
+    for i, (name, catalog) in enumerate(pairs):
+        entry = None if cache is None else cache.get(_lookup_key(name, catalog))
+        if entry is not None and now - entry[0] < CACHE_EXPIRY:
+            results[i] = entry[1]
         else:
+            misses.append(i)
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LOOKUPS) as pool:
+        futures = [
+            pool.submit(_query_catalog, catalog[1], name, catalog[2], catalog[3])
+            for name, catalog in (pairs[i] for i in misses)
+        ]
+        for i, future in zip(misses, futures):
             try:
-                temp = bv_to_temperature(bv)
-                rgb, hex_color = temperature_to_rgb(temp)
-                status = "ok"
-                print(
-                    f"✅ {name_candidates[0]} resolved via {resolved_used}"
-                    f" → T_eff = {temp:.0f} K ({source})"
-                )
-            except Exception as e:
-                temp = rgb = hex_color = None
-                status = "processing error"
-                error_message = str(e)
-                print(f"⚠️ Error for {name_candidates[0]}: {e}")
-
-        results.append({
-            'name': name_candidates[0],
-            'resolved_used': resolved_used,
-            'V': vmag,
-            'B-V': bv,
-            'U-B': ub,
-            'T_eff_K': round(temp) if status == 'ok' and not np.isnan(temp) else None,
-            'RGB': rgb if status == 'ok' else None,
-            'hex_color': hex_color if status == 'ok' else None,
-            'source': source,
-            'status': status,
-            'error_message': error_message
-        })
+                results[i] = future.result()
+            except Exception:
+                continue
+            if cache is not None:
+                cache[_lookup_key(*pairs[i])] = (time.time(), results[i])
+    hits = {catalog[0]: {} for catalog in catalogs}
+    for (name, catalog), result in zip(pairs, results):
+        if result:
+            hits[catalog[0]][name] = result
+    return [first_hits(pending, hits[catalog[0]], catalog[0]) for catalog in catalogs]
+
+def _csv_column(values):
+    """Return a float array as an object array with ``None`` for NaN."""
+    column = values.astype(object)
+    column[np.isnan(values)] = None
+    return column
+
+def write_results(writer, candidates, found, stars):
+    """Append the output rows for ``stars`` to a ``csv.writer``.
+
+    ``found`` is a photometry table indexed by star; stars missing from it
+    are written as ``no B-V``.  Every output column is filled for the whole
+    group at once and the rows are written in one go, in the order of
+    ``OUTPUT_COLUMNS``.
+    """
+    stars = list(stars)
+    if not stars:
+        return
+    n = len(stars)
+    total = len(candidates)
+    found = found.reindex(stars)
+    names = [candidates[i][0] for i in stars]
+    bv_arr = found["bv"].to_numpy(dtype=np.float64)
+    ub_arr = found["ub"].to_numpy(dtype=np.float64)
+    vmag_arr = found["vmag"].to_numpy(dtype=np.float64)
+    sources = found["source"].fillna("none").to_numpy(dtype=object)
+    resolved_names = found["resolved_used"].to_numpy(dtype=object, copy=True)
+    resolved_names[pd.isna(resolved_names)] = None
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        temps = bv_to_temperature(bv_arr)
+    # Beyond the pole of the fit (B-V below about -0.674) the formula gives
+    # negative temperatures, which are as unusable as infinite ones.
+    ok = np.isfinite(temps) & (temps > 0)
+    missing = np.isnan(bv_arr)
+    status = np.full(n, "ok", dtype=object)
+    status[~ok] = "processing error"
+    status[missing] = "no B-V"
+    error_messages = np.full(n, None, dtype=object)
+    t_eff = np.full(n, None, dtype=object)
+    rgb_col = np.full(n, None, dtype=object)
+    hex_col = np.full(n, None, dtype=object)
+    if ok.any():
+        rgb_ok, hex_ok = temperature_to_rgb(temps[ok])
+        t_eff[ok] = np.round(temps[ok]).astype(int)
+        hex_col[ok] = hex_ok
+        for pos, rgb in zip(np.flatnonzero(ok), rgb_ok.tolist()):
+            rgb_col[pos] = tuple(rgb)
+
+    for pos, i in enumerate(stars):
+        name = names[pos]
+        print(f"[{i + 1}/{total}] {name}")
+        if missing[pos]:
+            print(f"⚠️ No usable B–V found for {name}")
+        elif not ok[pos]:
+            error_messages[pos] = f"no positive finite temperature for B-V = {bv_arr[pos]}"
+            print(f"⚠️ Error for {name}: {error_messages[pos]}")
+        else:
+            print(
+                f"✅ {name} resolved via {resolved_names[pos]}"
+                f" → T_eff = {temps[pos]:.0f} K ({sources[pos]})"
+            )
+
+    writer.writerows(zip(
+        names, resolved_names, _csv_column(vmag_arr), _csv_column(bv_arr),
+        _csv_column(ub_arr), t_eff, rgb_col, hex_col, sources, status,
+        error_messages,
+    ))
+
+def _processed_names(csv_output):
+    """Return the star names already present in a previous output file.
+
+    Names are read as written, without type inference, so that they match
+    the name candidates of the input.  Raises ``ValueError`` if the file
+    exists but does not have the columns of this script's output, so that
+    resuming never appends rows that do not fit the file.
+    """
+    try:
+        with open(csv_output, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return set()
+            if header == OUTPUT_COLUMNS:
+                return {row[0] for row in reader if row}
+    except FileNotFoundError:
+        return set()
+    if header == OUTPUT_COLUMNS[:-1]:
+        raise ValueError(
+            f"{csv_output} was written by an older version without the "
+            "error_message column; start a fresh run instead of resuming"
+        )
+    raise ValueError(
+        f"{csv_output} does not have the results columns "
+        f"({', '.join(OUTPUT_COLUMNS)}), refusing to resume"
+    )
+
+def _restore_input_order(csv_output, input_names):
+    """Rewrite ``csv_output`` with its rows in the order of ``input_names``.
+
+    Rows are streamed in the order stars are settled; once a run has
+    finished they are put back in input order.
+    """
+    position = {}
+    for i, name in enumerate(input_names):
+        position.setdefault(name, i)
+    with open(csv_output, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    rows.sort(key=lambda row: position.get(row[0], len(position)))
+    tmp_output = f"{csv_output}.tmp"
+    with open(tmp_output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_output, csv_output)
+
+def process_star_catalog(csv_input="blue_stars.csv", csv_output="blue_stars_results.csv",
+                         cache_file=CACHE_FILE, resume=False):
+    """Process the input catalogue and write the results.
+
+    Rows are written as soon as a star's photometry is settled, so an
+    interrupted run keeps the stars it already found, and are sorted back
+    into input order when the run finishes.  With ``resume`` the stars
+    already listed in ``csv_output`` are skipped and new rows are appended.
+    Per-name lookups are cached in ``cache_file``; pass ``None`` to always
+    query the services.
+    """
+    # Names are read as text, so that numeric identifiers reach the
+    # services exactly as written.
+    df = pd.read_csv(csv_input, dtype=str)
+    # A positional query covers every star at once and must not be cut
+    # short, while a by-name query only needs its best row.
+    batch_catalogs = make_catalogs(row_limit=-1)
+    name_catalogs = make_catalogs(row_limit=1)
+
+    name_arr = df[NAME_COLUMNS].to_numpy(dtype=object)
+    valid_mask = ~pd.isna(name_arr)
+    candidates = [
+        names[mask].tolist()
+        for names, mask in zip(name_arr, valid_mask)
+    ]
+    input_names = [names[0] for names in candidates]
+    if resume:
+        done = _processed_names(csv_output)
+        if done:
+            print(f"Skipping {len(done)} stars already in {csv_output}")
+        candidates = [names for names in candidates if names[0] not in done]
+    total = len(candidates)
+
+    with open(csv_output, "a" if resume else "w", newline="") as out:
+        writer = csv.writer(out)
+        if out.tell() == 0:
+            writer.writerow(OUTPUT_COLUMNS)
+
+        found = merge_by_priority(
+            batch_crossmatch(candidates, batch_catalogs)
+        )
+        print(f"Positional cross-match found {len(found)}/{total} stars")
+        write_results(writer, candidates, found, found.index)
+        out.flush()
+
+        pending = {i: names for i, names in enumerate(candidates) if i not in found.index}
+        if pending:
+            with shelve.open(cache_file) if cache_file else nullcontext() as cache:
+                print(f"Looking up {len(pending)} remaining stars by name")
+                found = merge_by_priority(lookup_stars(pending, name_catalogs, cache))
+                write_results(writer, candidates, found, found.index)
+                out.flush()
+                pending = {i: names for i, names in pending.items()
+                           if i not in found.index}
+                if pending:
+                    print(f"Asking Simbad for {len(pending)} remaining stars")
+                    simbad = simbad_lookup(
+                        [name for names in pending.values() for name in names], cache
+                    )
+                    write_results(
+                        writer, candidates, first_hits(pending, simbad, "Simbad"), pending
+                    )
+
+    _restore_input_order(csv_output, input_names)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Query photometry for hot stars")
     parser.add_argument("--input", default="blue_stars.csv", help="CSV file with the star list")
     parser.add_argument("--output", default="blue_stars_results.csv", help="Output CSV file")
+    parser.add_argument("--cache", default=CACHE_FILE, help="File caching per-name lookups")
+    parser.add_argument("--no-cache", action="store_true", help="Always query the services")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip stars already in the output file and append the rest")
     args = parser.parse_args()
     try:
-        process_star_catalog(args.input, args.output)
+        process_star_catalog(args.input, args.output,
+                             None if args.no_cache else args.cache, args.resume)
     except Exception as exc:
         print(f"Error: {exc}", file=sys.stderr)
         sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,307 @@
+import csv
+import io
+import shelve
+
+import numpy as np
+import pytest
+from astropy.table import MaskedColumn, Table
+
+import blue_stars_query as bsq
+
+# Sexagesimal positions as returned by Simbad before astroquery 0.4.8.
+KNOWN_STARS = {
+    "Vega": ("18 36 56.3364", "+38 47 01.280"),
+    "Rigel": ("05 14 32.2723", "-08 12 05.898"),
+}
+
+
+def legacy_query_objects(names):
+    """Mimic ``Simbad.query_objects`` from astroquery < 0.4.8."""
+    rows = [
+        (*KNOWN_STARS[name], number)
+        for number, name in enumerate(names, start=1)
+        if name in KNOWN_STARS
+    ]
+    return Table(rows=rows, names=["RA", "DEC", "SCRIPT_NUMBER_ID"])
+
+
+def modern_query_objects(names):
+    """Mimic ``Simbad.query_objects`` from astroquery >= 0.4.8.
+
+    Unresolved names come back as rows with masked coordinates.
+    """
+    known = {"Vega": (279.2347, 38.7837), "Rigel": (78.6345, -8.2016)}
+    ra = [known.get(name, (0.0, 0.0))[0] for name in names]
+    dec = [known.get(name, (0.0, 0.0))[1] for name in names]
+    mask = [name not in known for name in names]
+    return Table({
+        "main_id": list(names),
+        "ra": MaskedColumn(ra, mask=mask),
+        "dec": MaskedColumn(dec, mask=mask),
+        "user_specified_id": list(names),
+    })
+
+
+class FakeVizier:
+    """Stand-in for ``Vizier`` answering positional queries with a fixed table."""
+
+    def __init__(self, table):
+        self.table = table
+        self.coords = None
+
+    def query_region(self, coords, radius=None, catalog=None):
+        self.coords = coords
+        return [self.table]
+
+
+@pytest.mark.parametrize("query_objects", [legacy_query_objects, modern_query_objects])
+def test_batch_crossmatch_maps_matches_back_to_stars(monkeypatch, query_objects):
+    monkeypatch.setattr(bsq.Simbad, "query_objects", query_objects)
+    # Targets are uploaded in star order: Vega (star 0), then Rigel (star 1).
+    gcpd = FakeVizier(Table({
+        "_q": [2, 1, 1],
+        "B-V": [-0.03, np.nan, 0.0],
+        "U-B": [-0.66, 0.0, 0.0],
+        "Vmag": [0.13, 1.0, 0.03],
+    }))
+    apass = FakeVizier(Table({"_q": [1], "B-V": [0.5], "Vmag": [3.0]}))
+
+    frames = bsq.batch_crossmatch(
+        [["Vega"], ["Unknown", "Rigel"], ["Sirius"]],
+        [("GCPD", gcpd, "II/215", False), ("APASS", apass, "II/336/apass9", False)],
+    )
+
+    assert len(gcpd.coords) == 2
+    gcpd_frame, apass_frame = frames
+    assert gcpd_frame.loc[0, "bv"] == 0.0
+    assert gcpd_frame.loc[0, "resolved_used"] == "Vega"
+    assert gcpd_frame.loc[1, "bv"] == -0.03
+    assert gcpd_frame.loc[1, "resolved_used"] == "Rigel"
+    assert 2 not in gcpd_frame.index
+    assert list(apass_frame.index) == [0]
+    merged = bsq.merge_by_priority(frames)
+    assert merged.loc[0, "source"] == "GCPD"
+
+
+@pytest.mark.parametrize("query_objects", [legacy_query_objects, modern_query_objects])
+def test_resolve_coordinates_reads_both_simbad_layouts(monkeypatch, query_objects):
+    monkeypatch.setattr(bsq.Simbad, "query_objects", query_objects)
+
+    resolved = bsq.resolve_coordinates(["Rigel", "Unknown", "Vega"])
+
+    assert set(resolved) == {"Rigel", "Vega"}
+    assert resolved["Vega"].ra.deg == pytest.approx(279.2347, abs=1e-3)
+    assert resolved["Rigel"].dec.deg == pytest.approx(-8.2016, abs=1e-3)
+
+
+class FakeSimbad:
+    """Stand-in for the shared Simbad client returning a fixed table."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def query_objects(self, names):
+        return self.table
+
+
+@pytest.mark.parametrize("prefix, id_column, ids", [
+    ("", "user_specified_id", ["Vega", "Rigel"]),
+    ("FLUX_", "SCRIPT_NUMBER_ID", [1, 2]),
+])
+def test_try_simbad_batch_reads_both_flux_layouts(monkeypatch, prefix, id_column, ids):
+    table = Table({
+        id_column: ids,
+        f"{prefix}U": MaskedColumn([-0.1, 0.0], mask=[False, True]),
+        f"{prefix}B": [0.0, 0.1],
+        f"{prefix}V": [0.03, 0.13],
+    })
+    monkeypatch.setattr(bsq, "_simbad_client", lambda: FakeSimbad(table))
+
+    found = bsq.try_simbad_batch(["Vega", "Rigel"])
+
+    assert found["Vega"] == pytest.approx((-0.03, -0.1, 0.03))
+    assert found["Rigel"][1] is None
+
+
+class FieldRecorder:
+    """Stand-in for ``Simbad`` recording the votable fields it is asked for."""
+
+    def __init__(self, error):
+        self.error = error
+        self.requested = []
+
+    def __call__(self):
+        return self
+
+    def add_votable_fields(self, *fields):
+        self.requested.append(fields)
+        if self.error is not None and len(self.requested) == 1:
+            raise self.error
+
+    def query_objects(self, names):
+        return None
+
+
+def test_simbad_client_falls_back_only_for_unknown_fields(monkeypatch):
+    old_astroquery = FieldRecorder(KeyError("U: no such field"))
+    monkeypatch.setattr(bsq, "Simbad", old_astroquery)
+    bsq._simbad_client.cache_clear()
+    assert bsq.try_simbad_batch(["Vega"]) == {}
+    assert old_astroquery.requested == [("U", "B", "V"), ("flux(U)", "flux(B)", "flux(V)")]
+
+    offline = FieldRecorder(ConnectionError("service unavailable"))
+    monkeypatch.setattr(bsq, "Simbad", offline)
+    bsq._simbad_client.cache_clear()
+    assert bsq.try_simbad_batch(["Vega"]) is None
+    assert offline.requested == [("U", "B", "V")]
+    bsq._simbad_client.cache_clear()
+
+
+def test_simbad_lookup_does_not_cache_unreadable_results(monkeypatch):
+    table = Table({"user_specified_id": ["Vega"], "main_id": ["* alf Lyr"]})
+    monkeypatch.setattr(bsq, "_simbad_client", lambda: FakeSimbad(table))
+    cache = {}
+
+    assert bsq.simbad_lookup(["Vega"], cache) == {}
+    assert cache == {}
+
+
+def test_lookup_stars_cache_key_depends_on_query_settings(monkeypatch):
+    calls = []
+    monkeypatch.setattr(bsq, "_query_catalog", lambda vizier, name, catalog_id, extract_tycho:
+                        calls.append(vizier.ROW_LIMIT) or (-0.1, None, 5.0))
+    cache = {}
+    filtered = [c for c in bsq.make_catalogs(row_limit=1) if c[0] == "APASS"]
+    unlimited = [c for c in bsq.make_catalogs(row_limit=-1) if c[0] == "APASS"]
+
+    bsq.lookup_stars({0: ["Vega"]}, filtered, cache)
+    bsq.lookup_stars({0: ["Vega"]}, filtered, cache)
+    bsq.lookup_stars({0: ["Vega"]}, unlimited, cache)
+
+    assert calls == [1, -1]
+    assert len(cache) == 2
+
+
+def test_write_results_rejects_unphysical_temperatures():
+    found = bsq.photometry_frame({
+        0: (-0.113, None, 10.5, "APASS", "Sirius"),
+        1: (-0.7, None, 2.0, "GCPD", "HD 1"),
+    })
+    out = io.StringIO()
+
+    bsq.write_results(csv.writer(out), [["Sirius"], ["HD 1"], ["Nope"]], found, [0, 1, 2])
+
+    rows = {row[0]: dict(zip(bsq.OUTPUT_COLUMNS, row))
+            for row in csv.reader(io.StringIO(out.getvalue()))}
+    assert rows["Sirius"]["status"] == "ok"
+    assert rows["Sirius"]["T_eff_K"] == "11796"
+    assert rows["Sirius"]["hex_color"] == "#BFD4FF"
+    assert rows["HD 1"]["status"] == "processing error"
+    assert rows["HD 1"]["T_eff_K"] == ""
+    assert rows["HD 1"]["hex_color"] == ""
+    assert "B-V = -0.7" in rows["HD 1"]["error_message"]
+    assert rows["Nope"]["status"] == "no B-V"
+
+
+def stub_services(monkeypatch, batch, by_name):
+    monkeypatch.setattr(bsq, "make_catalogs", lambda row_limit: [])
+    monkeypatch.setattr(bsq, "batch_crossmatch", lambda candidates, catalogs: [
+        bsq.photometry_frame({i: batch[names[0]] for i, names in enumerate(candidates)
+                              if names[0] in batch})
+    ])
+    monkeypatch.setattr(bsq, "lookup_stars", lambda pending, catalogs, cache: [
+        bsq.photometry_frame({i: by_name[names[0]] for i, names in pending.items()
+                              if names[0] in by_name})
+    ])
+    monkeypatch.setattr(bsq, "simbad_lookup", lambda names, cache: {})
+
+
+def output_names(path):
+    with open(path, newline="") as f:
+        return [row[0] for row in csv.reader(f)][1:]
+
+
+def test_process_star_catalog_keeps_input_order(tmp_path, monkeypatch):
+    csv_input = tmp_path / "stars.csv"
+    csv_input.write_text("name_input,name_resolved,name_alt1\nA,,\nB,,\nC,,\nD,,\n")
+    csv_output = tmp_path / "results.csv"
+    stub_services(monkeypatch,
+                  batch={"C": (-0.2, None, 5.0, "APASS", "C")},
+                  by_name={"A": (-0.1, None, 6.0, "GCPD", "A")})
+
+    bsq.process_star_catalog(str(csv_input), str(csv_output), cache_file=None)
+    assert output_names(csv_output) == ["A", "B", "C", "D"]
+
+    with open(csv_output, newline="") as f:
+        rows = list(csv.reader(f))
+    with open(csv_output, "w", newline="") as f:
+        csv.writer(f).writerows([rows[0], rows[3], rows[1]])
+    bsq.process_star_catalog(str(csv_input), str(csv_output), cache_file=None, resume=True)
+    assert output_names(csv_output) == ["A", "B", "C", "D"]
+
+
+@pytest.mark.parametrize("contents, reason", [
+    ("title,text\nhello,world\n", "does not have the results columns"),
+    (",".join(bsq.OUTPUT_COLUMNS[:-1]) + "\nVega,,,,,,,,none,no B-V\n", "older version"),
+])
+def test_resume_refuses_unrelated_output(tmp_path, monkeypatch, contents, reason):
+    csv_input = tmp_path / "stars.csv"
+    csv_input.write_text("name_input,name_resolved,name_alt1\nA,,\n")
+    csv_output = tmp_path / "notes.csv"
+    csv_output.write_text(contents)
+    stub_services(monkeypatch, batch={}, by_name={})
+
+    with pytest.raises(ValueError, match=reason):
+        bsq.process_star_catalog(str(csv_input), str(csv_output), cache_file=None, resume=True)
+    assert csv_output.read_text() == contents
+
+
+def test_resume_skips_numeric_names(tmp_path, monkeypatch):
+    csv_input = tmp_path / "stars.csv"
+    csv_input.write_text("name_input,name_resolved,name_alt1\n7001,,\n7002,,\n")
+    csv_output = tmp_path / "results.csv"
+    csv_output.write_text(",".join(bsq.OUTPUT_COLUMNS) + "\n7001,,,,,,,,none,no B-V,\n")
+    stub_services(monkeypatch, batch={}, by_name={})
+
+    bsq.process_star_catalog(str(csv_input), str(csv_output), cache_file=None, resume=True)
+
+    assert output_names(csv_output) == ["7001", "7002"]
+
+
+def test_lookup_stars_with_shelve_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def query_catalog(vizier, name, catalog_id, extract_tycho):
+        calls.append(name)
+        if name == "Offline":
+            raise ConnectionError("service unavailable")
+        return (-0.1, None, 5.0) if name == "Vega" else None
+
+    monkeypatch.setattr(bsq, "_query_catalog", query_catalog)
+    catalogs = [c for c in bsq.make_catalogs(row_limit=1) if c[0] == "GCPD"]
+    pending = {0: ["Vega"], 1: ["Nope", "Offline"]}
+
+    with shelve.open(str(tmp_path / "cache")) as cache:
+        frame, = bsq.lookup_stars(pending, catalogs, cache)
+        assert list(frame.index) == [0]
+        assert frame.loc[0, "resolved_used"] == "Vega"
+        assert sorted(calls) == ["Nope", "Offline", "Vega"]
+    with shelve.open(str(tmp_path / "cache")) as cache:
+        calls.clear()
+        frame, = bsq.lookup_stars(pending, catalogs, cache)
+        assert list(frame.index) == [0]
+        assert calls == ["Offline"]
+
+
+def test_numeric_names_are_kept_as_written(tmp_path, monkeypatch):
+    csv_input = tmp_path / "stars.csv"
+    csv_input.write_text("name_input,name_resolved,name_alt1\n7001,,\n007,8,\n")
+    csv_output = tmp_path / "results.csv"
+    stub_services(monkeypatch, batch={}, by_name={})
+    queried = []
+    monkeypatch.setattr(bsq, "simbad_lookup", lambda names, cache: queried.extend(names) or {})
+
+    bsq.process_star_catalog(str(csv_input), str(csv_output), cache_file=None)
+
+    assert queried == ["7001", "007", "8"]
+    assert output_names(csv_output) == ["7001", "007"]